@@ -0,0 +1,197 @@
+import base64
+import math
+import struct
+from collections.abc import Callable, Mapping
+from typing import Any, Final, TypeAlias
+
+from google.protobuf.descriptor import Descriptor, FieldDescriptor
+from google.protobuf.message import Message
+
+# Produces the same output as `MessageToDict` of
+# `google.protobuf.json_format` with `including_default_value_fields`
+# and `preserving_proto_field_name` enabled, but inspects each message
+# descriptor only once. The per-field dispatch on types, enum lookups
+# and default values are resolved when a message type is first converted
+# and cached for later messages.
+#
+# Fields with default values are always included, since presentations
+# index fields such as `ready` or `robot_count` directly even when they
+# are zero. Received messages are converted only when they are accessed
+# (see `LazyJsonizedMessage`).
+
+_Converter: TypeAlias = Callable[[Any], Any]
+_Builder: TypeAlias = Callable[[Message], dict[str, Any]]
+
+_INT64_TYPES: Final = frozenset(
+    [
+        FieldDescriptor.CPPTYPE_INT64,
+        FieldDescriptor.CPPTYPE_UINT64,
+    ],
+)
+
+_FLOAT_FORMAT: Final = struct.Struct("f")
+
+_builders: dict[str, _Builder] = {}
+
+
+def _to_shortest_float(value: float) -> float:
+    # Same as `MessageToDict`: the shortest decimal representation that
+    # is equal to the value after rounding to single precision.
+    precision = 6
+    rounded = float(f"{value:.{precision}g}")
+    while _FLOAT_FORMAT.unpack(_FLOAT_FORMAT.pack(rounded))[0] != value:
+        precision += 1
+        rounded = float(f"{value:.{precision}g}")
+    return rounded
+
+
+def _convert_float(value: float) -> float | str:
+    if math.isinf(value):
+        return "-Infinity" if value < 0.0 else "Infinity"
+    if math.isnan(value):
+        return "NaN"
+    return _to_shortest_float(value)
+
+
+def _convert_double(value: float) -> float | str:
+    if math.isinf(value):
+        return "-Infinity" if value < 0.0 else "Infinity"
+    if math.isnan(value):
+        return "NaN"
+    return value
+
+
+def _convert_bytes(value: bytes) -> str:
+    return base64.b64encode(value).decode("utf-8")
+
+
+def _make_converter(field: FieldDescriptor) -> _Converter | None:
+    """Returns a function converting a singular value of the field,
+    or `None` if the value can be used as it is.
+
+    """
+    match field.cpp_type:
+        case FieldDescriptor.CPPTYPE_MESSAGE:
+            full_name = field.message_type.full_name
+
+            def convert_message(value: Message) -> dict[str, Any]:
+                # Resolved on call since message types can be recursive.
+                return _builders[full_name](value)
+
+            _get_builder(field.message_type)
+            return convert_message
+        case FieldDescriptor.CPPTYPE_ENUM:
+            names = {
+                number: v.name
+                for number, v in field.enum_type.values_by_number.items()
+            }
+            return lambda value: names.get(value, value)
+        case FieldDescriptor.CPPTYPE_STRING:
+            if field.type == FieldDescriptor.TYPE_BYTES:
+                return _convert_bytes
+            return None
+        case FieldDescriptor.CPPTYPE_BOOL:
+            return bool
+        case FieldDescriptor.CPPTYPE_FLOAT:
+            return _convert_float
+        case FieldDescriptor.CPPTYPE_DOUBLE:
+            return _convert_double
+        case cpp_type if cpp_type in _INT64_TYPES:
+            return str
+        case _:
+            return None
+
+
+def _make_map_converter(field: FieldDescriptor) -> _Converter:
+    convert = _make_converter(field.message_type.fields_by_name["value"])
+
+    def convert_map(value: Mapping[object, object]) -> dict[str, Any]:
+        result = {}
+        for k, v in value.items():
+            key = ("true" if k else "false") if isinstance(k, bool) else str(k)
+            result[key] = v if convert is None else convert(v)
+        return result
+
+    return convert_map
+
+
+def _make_repeated_converter(field: FieldDescriptor) -> _Converter:
+    convert = _make_converter(field)
+    if convert is None:
+        return list
+    return lambda value: [convert(v) for v in value]
+
+
+def _is_map(field: FieldDescriptor) -> bool:
+    return (
+        field.cpp_type == FieldDescriptor.CPPTYPE_MESSAGE
+        and field.message_type.GetOptions().map_entry
+    )
+
+
+def _make_field_converter(field: FieldDescriptor) -> _Converter | None:
+    if _is_map(field):
+        return _make_map_converter(field)
+    if field.label == FieldDescriptor.LABEL_REPEATED:
+        return _make_repeated_converter(field)
+    return _make_converter(field)
+
+
+def _make_default(
+    field: FieldDescriptor,
+    convert: _Converter | None,
+) -> tuple[Any, type[list | dict] | None] | None:
+    """Returns the default value of the field and the type of container
+    created for every message instead, or `None` if the field is omitted
+    unless it is set.
+
+    """
+    if _is_map(field):
+        return (None, dict)
+    if field.label == FieldDescriptor.LABEL_REPEATED:
+        return (None, list)
+    # Singular message fields and oneof fields are omitted
+    # unless they are set.
+    if (
+        field.containing_oneof is not None
+        or field.cpp_type == FieldDescriptor.CPPTYPE_MESSAGE
+    ):
+        return None
+    default = field.default_value
+    return (default if convert is None else convert(default), None)
+
+
+def _get_builder(desc: Descriptor) -> _Builder:
+    if (builder := _builders.get(desc.full_name)) is not None:
+        return builder
+
+    # Converters of set fields, keyed by field numbers.
+    converters: dict[int, tuple[str, _Converter | None]] = {}
+    # Fields emitted with their default values when they are not set.
+    # Repeated and map fields get a fresh container for every message.
+    defaults: list[tuple[str, Any, type[list | dict] | None]] = []
+
+    def build(message: Message) -> dict[str, Any]:
+        result: dict[str, Any] = {}
+        for field, value in message.ListFields():
+            name, convert = converters[field.number]
+            result[name] = value if convert is None else convert(value)
+        for name, default, container in defaults:
+            if name not in result:
+                result[name] = default if container is None else container()
+        return result
+
+    # Register before visiting fields to terminate recursion.
+    _builders[desc.full_name] = build
+
+    for field in desc.fields:
+        convert = _make_field_converter(field)
+        converters[field.number] = (field.name, convert)
+        if (default := _make_default(field, convert)) is not None:
+            defaults.append((field.name, *default))
+
+    return build
+
+
+def message_to_dict(message: Message) -> dict[str, Any]:
+    return _get_builder(message.DESCRIPTOR)(message)
@@ -1,45 +1,113 @@
-import datetime
+import sys
 from abc import ABCMeta, abstractmethod
 from collections import deque
+from collections.abc import Callable, Iterator, Mapping
+from logging import getLogger
 from typing import Any, ClassVar, TypeAlias
 
+from google.protobuf.internal import api_implementation
+from google.protobuf.message import Message as ProtobufMessage
 from google.protobuf.message_factory import GetMessageClass
 
 from majsoulrpa.common import TimeoutType
 
+from .message_dict import message_to_dict
 from .protobuf_liqi import liqi_pb2
 
+logger = getLogger(__name__)
+
+if api_implementation.Type() == "python":
+    logger.warning(
+        "The pure Python implementation of Protocol Buffers is in use. "
+        "Install a `protobuf` wheel with the upb backend "
+        "for faster message parsing.",
+    )
+
+
+# Maps the name of a message to its request and response types. The
+# response type is `None` for messages other than RPCs.
+_MESSAGE_TYPE_MAP: dict[
+    str,
+    tuple[type[ProtobufMessage], type[ProtobufMessage] | None],
+] = {}
+for sdesc in liqi_pb2.DESCRIPTOR.services_by_name.values():
+    for mdesc in sdesc.methods:
+        _MESSAGE_TYPE_MAP[sys.intern("." + mdesc.full_name)] = (
+            GetMessageClass(mdesc.input_type),
+            GetMessageClass(mdesc.output_type),
+        )
+for tdesc in liqi_pb2.DESCRIPTOR.message_types_by_name.values():
+    _MESSAGE_TYPE_MAP[sys.intern("." + tdesc.full_name)] = (
+        GetMessageClass(tdesc),
+        None,
+    )
+
+# Maps the name of a message to its interned instance. Parsing a message
+# creates a new string for its name. Replacing it with the interned one
+# caches its hash and lets equality checks succeed by identity in the
+# lookups that follow.
+_MESSAGE_NAMES: dict[str, str] = {name: name for name in _MESSAGE_TYPE_MAP}
+
+
+class LazyJsonizedMessage(Mapping[str, Any]):
+    """A Protocol Buffers message converted to JSONizable object format
+    on first access.
+
+    Most of the dequeued messages are only logged or discarded by name,
+    so parsing their payloads up front is wasted work. The message
+    returned by `parse` is converted immediately and not retained, so
+    it may be reused for parsing other payloads. `parse` is released
+    after the conversion, together with the payload it refers to.
+    """
+
+    def __init__(self, parse: Callable[[], ProtobufMessage]) -> None:
+        self._parse: Callable[[], ProtobufMessage] | None = parse
+        self._jsonized: dict[str, Any] = {}
+
+    def _jsonize(self) -> dict[str, Any]:
+        if self._parse is not None:
+            self._jsonized = message_to_dict(self._parse())
+            self._parse = None
+        return self._jsonized
+
+    def __getitem__(self, key: str) -> Any:  # noqa: ANN401
+        return self._jsonize()[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._jsonize())
+
+    def __len__(self) -> int:
+        return len(self._jsonize())
+
+    def __repr__(self) -> str:
+        return repr(self._jsonize())
+
+
+# The last element is a POSIX timestamp. It is kept as a `float` since
+# few messages need it as `datetime.datetime`.
 Message: TypeAlias = tuple[
     str,
     str,
-    dict[str, Any],
-    dict[str, Any] | None,
-    datetime.datetime,
+    Mapping[str, Any],
+    Mapping[str, Any] | None,
+    float,
 ]
 
 
 class MessageQueueClientBase(metaclass=ABCMeta):
     def __init__(self, host: str, port: int | None) -> None:  # noqa: ARG002
-        self._put_back_messages: deque[Message] = deque()
+        # Messages to be dequeued before receiving new ones. Put-back
+        # messages are queued parsed, and messages received in a batch
+        # are queued as raw frames to be parsed when they are dequeued.
+        self._incoming: deque[Message | list[bytes]] = deque()
         self._account_id: int | None = None
-
-        self._message_type_map: dict = {}
-        for sdesc in liqi_pb2.DESCRIPTOR.services_by_name.values():
-            for mdesc in sdesc.methods:
-                self._message_type_map["." + mdesc.full_name] = (
-                    GetMessageClass(mdesc.input_type),
-                    GetMessageClass(mdesc.output_type),
-                )
-        for tdesc in liqi_pb2.DESCRIPTOR.message_types_by_name.values():
-            self._message_type_map["." + tdesc.full_name] = (
-                GetMessageClass(tdesc),
-                None,
-            )
+        self._message_type_map = _MESSAGE_TYPE_MAP
+        self._message_names = _MESSAGE_NAMES
 
     # List of WebSocket messages that can obtain account id
-    _ACCOUNT_ID_MESSAGES: ClassVar[dict[str, list[str]]] = {
-        ".lq.Lobby.oauth2Login": ["account_id"],
-        ".lq.Lobby.createRoom": ["room", "owner_id"],
+    _ACCOUNT_ID_MESSAGES: ClassVar[dict[str, tuple[str, ...]]] = {
+        ".lq.Lobby.oauth2Login": ("account_id",),
+        ".lq.Lobby.createRoom": ("room", "owner_id"),
     }
 
     @abstractmethod
@@ -47,7 +115,7 @@ class MessageQueueClientBase(metaclass=ABCMeta):
         pass
 
     def put_back(self, message: Message) -> None:
-        self._put_back_messages.appendleft(message)
+        self._incoming.appendleft(message)
 
     @property
     def account_id(self) -> int | None:
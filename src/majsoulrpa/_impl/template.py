@@ -1,4 +1,6 @@
 import datetime
+import functools
+import time
 import tomllib
 from collections.abc import Iterable, Sequence
 from pathlib import Path
@@ -7,7 +9,11 @@ from typing import Final, Self
 import cv2
 import numpy as np
 
-from majsoulrpa.common import TimeoutType, timeout_to_deadline
+from majsoulrpa.common import (
+    TimeoutType,
+    deadline_to_monotonic,
+    timeout_to_deadline,
+)
 from majsoulrpa.presentation.exceptions import PresentationTimeoutError
 
 from .browser import STD_HEIGHT, STD_WIDTH, BrowserBase
@@ -26,6 +32,14 @@ def screenshot_to_opencv(screenshot_bytes: bytes) -> np.ndarray:
     return cv2.imdecode(img_array, cv2.IMREAD_COLOR)
 
 
+def _to_opencv(screenshot: bytes | np.ndarray) -> np.ndarray:
+    # Screenshots matched against several templates can be decoded once
+    # by the caller and passed as an image.
+    if isinstance(screenshot, bytes):
+        return screenshot_to_opencv(screenshot)
+    return screenshot
+
+
 class Template:
     def __init__(
         self,
@@ -80,7 +94,10 @@ class Template:
     def threshold(self) -> float:
         return self._threshold
 
+    # Templates are never mutated after construction, so instances can
+    # be shared instead of decoding and resizing the image every time.
     @classmethod
+    @functools.lru_cache(maxsize=128)
     def open_file(cls, name_or_path: str | Path, zoom_ratio: float) -> Self:  # noqa: C901
         if isinstance(name_or_path, str):
             path = _PATH_TEMPLATE / Path(name_or_path)
@@ -127,8 +144,11 @@ class Template:
 
         return cls(png_path, zoom_ratio, **config)
 
-    def best_template_match(self, screenshot: bytes) -> tuple[int, int, float]:
-        image = screenshot_to_opencv(screenshot)
+    def best_template_match(
+        self,
+        screenshot: bytes | np.ndarray,
+    ) -> tuple[int, int, float]:
+        image = _to_opencv(screenshot)
         image = image[self._top : self._bottom, self._left : self._right, :]
 
         if image.shape[0] < self._templ.shape[0]:
@@ -158,7 +178,7 @@ class Template:
 
         return (self._left + argmax_x, self._top + argmax_y, max_score)
 
-    def match(self, screenshot: bytes) -> bool:
+    def match(self, screenshot: bytes | np.ndarray) -> bool:
         _, _, score = self.best_template_match(screenshot)
         return score >= self._threshold
 
@@ -167,8 +187,9 @@ class Template:
         browser: BrowserBase,
         deadline: datetime.datetime,
     ) -> None:
+        monotonic_deadline = deadline_to_monotonic(deadline)
         while True:
-            if datetime.datetime.now(datetime.UTC) > deadline:
+            if time.monotonic() > monotonic_deadline:
                 msg = f"Timeout in waiting {self._path}"
                 raise PresentationTimeoutError(msg, browser.get_screenshot())
             if self.match(browser.get_screenshot()):
@@ -215,8 +236,9 @@ class Template:
         deadline: datetime.datetime,
         edge_sigma: float = _STD_EDGE_SIGMA,
     ) -> None:
+        monotonic_deadline = deadline_to_monotonic(deadline)
         while True:
-            if datetime.datetime.now(datetime.UTC) > deadline:
+            if time.monotonic() > monotonic_deadline:
                 msg = f"Timeout in waiting {self._path}"
                 raise PresentationTimeoutError(msg, browser.get_screenshot())
             x, y, score = self.best_template_match(browser.get_screenshot())
@@ -242,14 +264,23 @@ class Template:
 
     @staticmethod
     def match_one_of(
-        screenshot: bytes,
+        screenshot: bytes | np.ndarray,
         templates: Sequence["Template"],
     ) -> int:
+        image = _to_opencv(screenshot)
         for i, template in enumerate(templates):
-            if template.match(screenshot):
+            if template.match(image):
                 return i
         return -1
 
+    @staticmethod
+    def match_all(
+        screenshot: bytes | np.ndarray,
+        templates: Iterable["Template"],
+    ) -> bool:
+        image = _to_opencv(screenshot)
+        return all(template.match(image) for template in templates)
+
     @staticmethod
     def wait_until_one_of_then_click(
         templates: Iterable["Template"],
@@ -257,14 +288,15 @@ class Template:
         deadline: datetime.datetime,
         edge_sigma: float = _STD_EDGE_SIGMA,
     ) -> None:
+        monotonic_deadline = deadline_to_monotonic(deadline)
         while True:
-            if datetime.datetime.now(datetime.UTC) > deadline:
+            if time.monotonic() > monotonic_deadline:
                 msg = "Timeout"
                 raise PresentationTimeoutError(msg, browser.get_screenshot())
 
-            screenshot = browser.get_screenshot()
+            image = screenshot_to_opencv(browser.get_screenshot())
             for template in templates:
-                x, y, score = template.best_template_match(screenshot)
+                x, y, score = template.best_template_match(image)
                 if score >= template.threshold:
                     browser.click_region(
                         x,
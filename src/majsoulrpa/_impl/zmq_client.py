@@ -1,19 +1,28 @@
-import base64
 import datetime
-import json
+import struct
 from ipaddress import ip_address
 from pathlib import Path
 from typing import Any
 
-import google.protobuf.json_format
 import zmq
+from google.protobuf.message import Message as ProtobufMessage
 from zmq.utils.win32 import allow_interrupt
 
 from majsoulrpa.common import TimeoutType, to_timedelta, validate_user_port
 
-from .message_queue_client import Message, MessageQueueClientBase
+from .message_queue_client import (
+    LazyJsonizedMessage,
+    Message,
+    MessageQueueClientBase,
+)
 from .protobuf_liqi import liqi_pb2
 
+# The format of the timestamp frame sent by the sniffer.
+_TIMESTAMP_FORMAT = struct.Struct("!d")
+
+# The maximum number of messages received at once.
+_MAX_BATCH_SIZE = 8
+
 
 class ZMQClient(MessageQueueClientBase):
     def __init__(self, host: str = "127.0.0.1", port: int = 37247) -> None:
@@ -26,148 +35,174 @@ class ZMQClient(MessageQueueClientBase):
         self._socket.subscribe(b"ws")
         self._poller_in = zmq.Poller()
         self._poller_in.register(self._socket, zmq.POLLIN)
+        # Protocol Buffers messages reused for parsing to avoid
+        # constructing them for every WebSocket message.
+        self._wrapper = liqi_pb2.Wrapper()  # type: ignore[attr-defined]
+        self._parsers: dict[type[ProtobufMessage], ProtobufMessage] = {}
 
     def __del__(self) -> None:
         self._poller_in.unregister(self._socket)
         self._socket.close()
         self._context.destroy()
 
-    def dequeue_message(self, timeout: TimeoutType) -> Message | None:  # noqa: C901
+    def _unwrap(self, message: bytes) -> tuple[str, bytes]:
+        self._wrapper.ParseFromString(message)
+        name = self._wrapper.name
+        return (self._message_names.get(name, name), self._wrapper.data)
+
+    def _parse(
+        self,
+        message_type: type[ProtobufMessage],
+        data: bytes,
+    ) -> ProtobufMessage:
+        parser = self._parsers.get(message_type)
+        if parser is None:
+            parser = message_type()
+            self._parsers[message_type] = parser
+        # `ParseFromString` clears the message before parsing.
+        parser.ParseFromString(data)
+        return parser
+
+    def _get_message_type(
+        self,
+        name: str,
+        data: bytes,
+        *,
+        is_response: bool,
+    ) -> type[ProtobufMessage]:
+        message_types = self._message_type_map.get(name)
+        if message_types is not None:
+            message_type = message_types[1 if is_response else 0]
+            if message_type is not None:
+                return message_type
+
+        now = datetime.datetime.now(datetime.UTC)
+        file_name = now.strftime(f"%Y-%m-%d-%H-%M-%S-{name}.bin")
+        with Path(file_name).open("wb") as fp:
+            fp.write(data)
+        msg = (
+            "A new API found:\n"
+            f"  name: {name}\n"
+            f"Raw data was saved to {file_name}.\n"
+            "Please cooperate by providing data. "
+            "Thank you for your cooperation."
+        )
+        raise RuntimeError(msg)
+
+    def dequeue_message(self, timeout: TimeoutType) -> Message | None:
         timeout = to_timedelta(timeout)
 
         if timeout.total_seconds() <= 0.0:
             return None
 
-        if len(self._put_back_messages) > 0:
-            return self._put_back_messages.popleft()
-
-        with allow_interrupt(self.__del__):
-            if self._poller_in.poll(int(timeout.total_seconds() * 1000)):
-                [_, message_bytes] = self._socket.recv_multipart()
-            else:
-                return None
-
-        message_str = message_bytes.decode(encoding="utf-8")
-        message = json.loads(message_str)
-        request_direction: str = message["request_direction"]
-        encoded_request: str = message["request"]
-        encoded_response: str | None = message["response"]
-        timestamp_float: float = message["timestamp"]
-
-        # Decode the data that was encoded for JSON.
-        request = base64.b64decode(encoded_request)
-        if encoded_response is not None:
-            response = base64.b64decode(encoded_response)
-        else:
-            response = None
-        timestamp = datetime.datetime.fromtimestamp(
-            timestamp_float,
-            datetime.UTC,
-        )
-
-        def unwrap_message(message: bytes) -> tuple[str, bytes]:
-            wrapper = liqi_pb2.Wrapper()  # type: ignore[attr-defined]
-            wrapper.ParseFromString(message)
-            return (wrapper.name, wrapper.data)
+        try:
+            entry = self._incoming.popleft()
+        except IndexError:
+            with allow_interrupt(self.__del__):
+                if not self._poller_in.poll(
+                    int(timeout.total_seconds() * 1000),
+                ):
+                    return None
+                self._receive_batch()
+            entry = self._incoming.popleft()
+
+        # Received messages are parsed one at a time, so that an error
+        # in one of them is raised after the messages before it have
+        # been dequeued and does not drop the ones after it.
+        if isinstance(entry, list):
+            return self._parse_frames(entry)
+        return entry
+
+    def _receive_batch(self) -> None:
+        # The socket is known to be readable, so the first receive does
+        # not block. The following ones take only the messages that have
+        # already arrived, so that the next calls of `dequeue_message`
+        # skip polling the socket.
+        self._incoming.append(self._socket.recv_multipart())
+        for _ in range(_MAX_BATCH_SIZE - 1):
+            try:
+                frames = self._socket.recv_multipart(zmq.NOBLOCK)
+            except zmq.Again:
+                break
+            self._incoming.append(frames)
+
+    def _parse_frames(self, frames: list[bytes]) -> Message:  # noqa: C901
+        [_, direction_bytes, request, response, timestamp_bytes] = frames
+        request_direction = direction_bytes.decode(encoding="utf-8")
+        (timestamp,) = _TIMESTAMP_FORMAT.unpack(timestamp_bytes)
 
         match request[0]:
             # A request message that does not require a response
             # is missing the two bytes of the message number.
             case 1:
-                name, request_data = unwrap_message(request[1:])
+                name, request_data = self._unwrap(request[1:])
             # A request message that has a corresponding
             # response message, there are 2 bytes to store
             # the message number, and the name must be extracted to
             # parse the response message.
             case 2:
-                name, request_data = unwrap_message(request[3:])
+                name, request_data = self._unwrap(request[3:])
             case _:
                 msg = f"{request[0]}: unknown request type."
                 raise RuntimeError(msg)
 
-        if response is not None:
+        # The payloads are converted on first access (see
+        # `LazyJsonizedMessage`). The frames and the message types are
+        # still checked here, so that malformed messages and new APIs
+        # are reported when dequeued.
+        request_type = self._get_message_type(
+            name,
+            request_data,
+            is_response=False,
+        )
+
+        def parse_request() -> ProtobufMessage:
+            return self._parse(request_type, request_data)
+
+        jsonized_request = LazyJsonizedMessage(parse_request)
+
+        jsonized_response: LazyJsonizedMessage | None
+        # An empty frame means that there is no response.
+        if len(response) > 0:
             if response[0] != 3:  # noqa: PLR2004
                 msg = f"{response[0]}: unknown response type."
                 raise RuntimeError(msg)
-            response_name, response_data = unwrap_message(response[3:])
+            response_name, response_data = self._unwrap(response[3:])
             if response_name != "":
                 msg = f"{response_name}: unknown response name."
                 raise RuntimeError(msg)
-        else:
-            response_data = b""
-
-        # Convert Protocol Buffers messages to JSONizable object format
-        def jsonize(
-            name: str,
-            data: bytes,
-            *,
-            is_response: bool,
-        ) -> dict[str, Any]:
-            if is_response:
-                try:
-                    parser = self._message_type_map[name][1]()
-                except IndexError as ie:
-                    now = datetime.datetime.now(datetime.UTC)
-                    file_name = now.strftime(f"%Y-%m-%d-%H-%M-%S-{name}.bin")
-                    with Path(file_name).open("wb") as fp:
-                        fp.write(data)
-                    msg = (
-                        "A new API found:\n"
-                        f"  name: {name}\n"
-                        f"Raw data was saved to {file_name}.\n"
-                        "Please cooperate by providing data. "
-                        "Thank you for your cooperation."
-                    )
-                    raise RuntimeError(msg) from ie
-            else:
-                try:
-                    parser = self._message_type_map[name][0]()
-                except KeyError as ke:
-                    now = datetime.datetime.now(datetime.UTC)
-                    file_name = now.strftime(f"%Y-%m-%d-%H-%M-%S-{name}.bin")
-                    with Path(file_name).open("wb") as fp:
-                        fp.write(data)
-                    msg = (
-                        "A new API found:\n"
-                        f"  name: {name}\n"
-                        f"Raw data was saved to {file_name}.\n"
-                        "Please cooperate by providing data. "
-                        "Thank you for your cooperation."
-                    )
-                    raise RuntimeError(msg) from ke
-
-            parser.ParseFromString(data)
-
-            return google.protobuf.json_format.MessageToDict(
-                parser,
-                including_default_value_fields=True,
-                preserving_proto_field_name=True,
+            response_type = self._get_message_type(
+                name,
+                response_data,
+                is_response=True,
             )
 
-        jsonized_request = jsonize(name, request_data, is_response=False)
-        if response is not None:
-            jsonized_response = jsonize(name, response_data, is_response=True)
+            def parse_response() -> ProtobufMessage:
+                return self._parse(response_type, response_data)
+
+            jsonized_response = LazyJsonizedMessage(parse_response)
         else:
             jsonized_response = None
 
         # If the message contains an account ID,
         # extract the account ID.
-        if name in MessageQueueClientBase._ACCOUNT_ID_MESSAGES:  # noqa: SLF001
+        keys = self._ACCOUNT_ID_MESSAGES.get(name)
+        if keys is not None:
             if jsonized_response is None:
                 msg = "Message without any response."
                 raise RuntimeError(msg)
-            account_id = jsonized_response
-            keys = MessageQueueClientBase._ACCOUNT_ID_MESSAGES[name]  # noqa: SLF001
-            for key in keys:
-                if key not in account_id:
-                    msg = (
-                        f"{name}: {key}: Could not find account id field:\n"
-                        f"{jsonized_response}"
-                    )
-                    raise RuntimeError(msg)
-                account_id = account_id[key]
+            account_id: Any = jsonized_response
+            try:
+                for key in keys:
+                    account_id = account_id[key]
+            except KeyError as ke:
+                msg = (
+                    f"{name}: {ke.args[0]}: Could not find account id field:\n"
+                    f"{jsonized_response}"
+                )
+                raise RuntimeError(msg) from ke
             if self._account_id is None:
-                self._account_id = account_id  # type: ignore[assignment]
+                self._account_id = account_id
             elif account_id != self._account_id:
                 msg = "Inconsistent account IDs."
                 raise RuntimeError(msg)
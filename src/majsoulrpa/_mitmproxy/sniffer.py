@@ -1,8 +1,7 @@
 # ruff: noqa: S101, INP001
-import base64
 import datetime
-import json
 import re
+import struct
 from ipaddress import ip_address
 from logging import getLogger
 
@@ -162,27 +161,19 @@ class Sniffer:
                 raise RuntimeError(msg)
             assert direction == "inbound"
 
-        # Encode to JSON format so that
-        # it can be enqueueed to message queue.
-        encoded_request = base64.b64encode(request).decode(encoding="utf-8")
-        if response is not None:
-            encoded_response = base64.b64encode(response).decode(
-                encoding="utf-8",
-            )
-        else:
-            encoded_response = None
+        # Send each field as a separate frame so that the raw messages
+        # can be enqueued to message queue without any encoding.
+        # An empty response frame means that there is no response.
         now = datetime.datetime.now(tz=datetime.UTC)
-        data = {
-            "request_direction": request_direction,
-            "request": encoded_request,
-            "response": encoded_response,
-            "timestamp": now.timestamp(),
-        }
-
-        data_str = json.dumps(data, allow_nan=False, separators=(",", ":"))
-        data_bytes = data_str.encode(encoding="utf-8")
-
-        self._socket.send_multipart([b"ws", data_bytes])
+        self._socket.send_multipart(
+            [
+                b"ws",
+                request_direction.encode(encoding="utf-8"),
+                request,
+                response if response is not None else b"",
+                struct.pack("!d", now.timestamp()),
+            ],
+        )
 
 
 addons = [Sniffer()]
@@ -1,10 +1,16 @@
 from .player import Player
-from .timeout import TimeoutType, timeout_to_deadline, to_timedelta
+from .timeout import (
+    TimeoutType,
+    deadline_to_monotonic,
+    timeout_to_deadline,
+    to_timedelta,
+)
 from .validation import validate_user_port
 
 __all__ = [
     "Player",
     "TimeoutType",
+    "deadline_to_monotonic",
     "timeout_to_deadline",
     "to_timedelta",
     "validate_user_port",
@@ -1,4 +1,5 @@
 import datetime
+import time
 from typing import TypeAlias
 
 TimeoutType: TypeAlias = int | float | datetime.timedelta
@@ -14,3 +15,8 @@ def to_timedelta(seconds: TimeoutType) -> datetime.timedelta:
 
 def timeout_to_deadline(timeout: TimeoutType) -> datetime.datetime:
     return datetime.datetime.now(datetime.UTC) + to_timedelta(timeout)
+
+
+def deadline_to_monotonic(deadline: datetime.datetime) -> float:
+    remaining = deadline - datetime.datetime.now(datetime.UTC)
+    return time.monotonic() + remaining.total_seconds()
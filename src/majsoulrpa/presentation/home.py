@@ -3,12 +3,16 @@ import re
 import time
 from enum import IntEnum
 from logging import getLogger
-from typing import Literal
+from typing import ClassVar, Literal
 
 from majsoulrpa import RPA
 from majsoulrpa._impl.browser import BrowserBase
-from majsoulrpa._impl.template import Template
-from majsoulrpa.common import TimeoutType, timeout_to_deadline
+from majsoulrpa._impl.template import Template, screenshot_to_opencv
+from majsoulrpa.common import (
+    TimeoutType,
+    deadline_to_monotonic,
+    timeout_to_deadline,
+)
 
 from .exceptions import (
     InconsistentMessageError,
@@ -51,16 +55,97 @@ class HomePresentation(PresentationBase):
     * Join a room for friendly matches by entering a room ID.
     """
 
+    # Messages exchanged during login that are only logged.
+    _LOGIN_IGNORED_MESSAGES: ClassVar[frozenset[str]] = frozenset(
+        {
+            ".lq.Lobby.heatbeat",
+            ".lq.NotifyReviveCoinUpdate",
+            ".lq.NotifyGiftSendRefresh",
+            ".lq.NotifyDailyTaskUpdate",
+            ".lq.NotifyAccountChallengeTaskUpdate",
+            ".lq.NotifyActivityChange",
+            ".lq.NotifyAccountUpdate",  # TODO: Analyzing content
+            ".lq.NotifyShopUpdate",  # TODO: Analyzing content
+            ".lq.Lobby.oauth2Auth",
+            ".lq.Lobby.oauth2Check",
+            ".lq.NotifyNewMail",
+            ".lq.Lobby.oauth2Login",
+            ".lq.Lobby.fetchLastPrivacy",
+            ".lq.Lobby.fetchServerTime",
+            ".lq.Lobby.fetchServerSettings",
+            ".lq.Lobby.fetchConnectionInfo",
+            ".lq.Lobby.fetchClientValue",
+            ".lq.Lobby.fetchFriendList",
+            ".lq.Lobby.fetchFriendApplyList",
+            ".lq.Lobby.fetchRecentFriend",
+            ".lq.Lobby.fetchMailInfo",
+            ".lq.Lobby.fetchReviveCoinInfo",
+            ".lq.Lobby.fetchTitleList",
+            ".lq.Lobby.fetchBagInfo",
+            ".lq.Lobby.fetchShopInfo",
+            ".lq.Lobby.fetchShopInterval",
+            ".lq.Lobby.fetchActivityList",
+            ".lq.Lobby.fetchActivityInterval",
+            ".lq.Lobby.fetchActivityBuff",
+            ".lq.Lobby.fetchVipReward",
+            ".lq.Lobby.fetchMonthTicketInfo",
+            ".lq.Lobby.fetchAchievement",
+            ".lq.Lobby.fetchSelfGamePointRank",
+            ".lq.Lobby.fetchCommentSetting",
+            ".lq.Lobby.fetchAccountSettings",
+            ".lq.Lobby.fetchModNicknameTime",
+            ".lq.Lobby.fetchMisc",
+            ".lq.Lobby.fetchAnnouncement",
+            ".lq.Lobby.fetchRollingNotice",
+            ".lq.Lobby.loginSuccess",
+            ".lq.Lobby.fetchCharacterInfo",
+            ".lq.Lobby.fetchAllCommonViews",
+            ".lq.Lobby.fetchCollectedGameRecordList",
+            ".lq.Lobby.modifyRoom",
+            ".lq.NotifyRoomPlayerUpdate",
+            ".lq.NotifyRoomPlayerReady",
+            ".lq.Lobby.readyPlay",
+            ".lq.Lobby.fetchInfo",  # TODO: Analyzing content
+            ".lq.Lobby.fetchActivityFlipInfo",
+            ".lq.Lobby.fetchCustomizedContestList",
+            ".lq.Lobby.fetchCustomizedContestExtendInfo",
+            ".lq.Lobby.fetchCustomizedContestOnlineInfo",
+            ".lq.Lobby.startCustomizedContest",
+            ".lq.Lobby.stopCustomizedContest",
+        },
+    )
+
+    # Messages indicating that the login is about to complete.
+    _LOGIN_COMPLETION_MESSAGES: ClassVar[frozenset[str]] = frozenset(
+        {
+            ".lq.Lobby.fetchDailyTask",
+            ".lq.Lobby.leaveRoom",
+            ".lq.Lobby.leaveCustomizedContest",
+            ".lq.Lobby.leaveCustomizedContestChatRoom",
+            ".lq.Lobby.fetchAccountActivityData",
+        },
+    )
+
+    # Messages exchanged after login that are only logged.
+    _POST_LOGIN_IGNORED_MESSAGES: ClassVar[frozenset[str]] = frozenset(
+        {
+            ".lq.Lobby.heatbeat",
+            ".lq.Lobby.updateClientValue",
+            ".lq.NotifyAccountUpdate",
+            ".lq.NotifyAnnouncementUpdate",
+            ".lq.Lobby.readAnnouncement",
+            ".lq.Lobby.doActivitySignIn",
+            ".lq.Lobby.fetchDailyTask",  # TODO: Analyzing content
+        },
+    )
+
     @staticmethod
     def _match_markers(screenshot: bytes, zoom_ratio: float) -> bool:
-        for i in range(1, 4):
-            template = Template.open_file(
-                f"template/home/marker{i}",
-                zoom_ratio,
-            )
-            if not template.match(screenshot):
-                return False
-        return True
+        templates = [
+            Template.open_file(f"template/home/marker{i}", zoom_ratio)
+            for i in range(1, 4)
+        ]
+        return Template.match_all(screenshot, templates)
 
     @staticmethod
     def _receive_daily_bonus(
@@ -79,36 +164,52 @@ class HomePresentation(PresentationBase):
     def _close_notifications(
         browser: BrowserBase,
         deadline: datetime.datetime,
+        screenshot: bytes | None = None,
     ) -> None:
         """Close home screen notifications if they are visible.
 
+        If `screenshot` is given, it is used in place of taking the
+        first screenshot.
+
         Note:
             Supports Blue Archive collaboration commemorative event.
             2024-04-08 6:00 - 2024-04-17 5:59 (UTC+9)
 
         """
+        zoom_ratio = browser.zoom_ratio
         notification_close = Template.open_file(
             "template/home/notification_close",
-            browser.zoom_ratio,
+            zoom_ratio,
         )
         event_close = Template.open_file(
             "template/home/event_close",
-            browser.zoom_ratio,
+            zoom_ratio,
         )
         rewards_sign_in = Template.open_file(
             # Only during collaboration commemorative event period
             "template/home/accumulated_sign_in_rewards_sign_in_202404",
-            browser.zoom_ratio,
+            zoom_ratio,
+        )
+        rewards_confirm = Template.open_file(
+            # Only during collaboration commemorative event period
+            "template/home/accumulated_sign_in_rewards_confirm_202404",
+            zoom_ratio,
         )
 
+        monotonic_deadline = deadline_to_monotonic(deadline)
         while True:
-            if datetime.datetime.now(datetime.UTC) > deadline:
+            if time.monotonic() > monotonic_deadline:
                 msg = "Timeout."
                 raise PresentationTimeoutError(msg, browser.get_screenshot())
 
-            ss = browser.get_screenshot()
+            if screenshot is not None:
+                ss, screenshot = screenshot, None
+            else:
+                ss = browser.get_screenshot()
+            # Decode once for matching against several templates.
+            image = screenshot_to_opencv(ss)
 
-            x, y, score = notification_close.best_template_match(ss)
+            x, y, score = notification_close.best_template_match(image)
             if score >= notification_close.threshold:
                 browser.click_region(
                     x,
@@ -119,7 +220,7 @@ class HomePresentation(PresentationBase):
                 time.sleep(1.0)
                 continue
 
-            x, y, score = event_close.best_template_match(ss)
+            x, y, score = event_close.best_template_match(image)
             if score >= event_close.threshold:
                 browser.click_region(
                     x,
@@ -130,7 +231,7 @@ class HomePresentation(PresentationBase):
                 time.sleep(1.0)
                 continue
 
-            x, y, score = rewards_sign_in.best_template_match(ss)
+            x, y, score = rewards_sign_in.best_template_match(image)
             if score >= rewards_sign_in.threshold:
                 browser.click_region(
                     x,
@@ -140,14 +241,8 @@ class HomePresentation(PresentationBase):
                 )
                 time.sleep(1.9)
 
-                rewards_confirm = Template.open_file(
-                    # Only during collaboration commemorative event
-                    # period
-                    "template/home/accumulated_sign_in_rewards_confirm_202404",
-                    browser.zoom_ratio,
-                )
                 while True:
-                    if datetime.datetime.now(datetime.UTC) > deadline:
+                    if time.monotonic() > monotonic_deadline:
                         msg = "Timeout."
                         raise PresentationTimeoutError(
                             msg,
@@ -226,11 +321,16 @@ class HomePresentation(PresentationBase):
         """
         super().__init__(rpa, creator)
 
+        # Fixed for the lifetime of the browser. Retrieving it from a
+        # remote browser requires a round trip, so it is fetched once.
+        self._zoom_ratio = self._browser.zoom_ratio
+
         deadline = timeout_to_deadline(timeout)
+        monotonic_deadline = deadline_to_monotonic(deadline)
 
         template = Template.open_file(
             "template/home/marker0",
-            self._browser.zoom_ratio,
+            self._zoom_ratio,
         )
         ss = self._browser.get_screenshot()
         if not template.match(ss):
@@ -240,9 +340,8 @@ class HomePresentation(PresentationBase):
         has_month_ticket = False
         num_login_beats = 0
         while True:
-            now = datetime.datetime.now(datetime.UTC)
             message = self._message_queue_client.dequeue_message(
-                deadline - now,
+                monotonic_deadline - time.monotonic(),
             )
             if message is None:
                 msg = "Timeout."
@@ -252,113 +351,50 @@ class HomePresentation(PresentationBase):
                 )
             _, name, _, _, _ = message
 
-            match name:
-                case (
-                    ".lq.Lobby.heatbeat"
-                    | ".lq.NotifyReviveCoinUpdate"
-                    | ".lq.NotifyGiftSendRefresh"
-                    | ".lq.NotifyDailyTaskUpdate"
-                    | ".lq.NotifyAccountChallengeTaskUpdate"
-                    | ".lq.NotifyActivityChange"
-                    | ".lq.NotifyAccountUpdate"  # TODO: Analyzing content
-                    | ".lq.NotifyShopUpdate"  # TODO: Analyzing content
-                    | ".lq.Lobby.oauth2Auth"
-                    | ".lq.Lobby.oauth2Check"
-                    | ".lq.NotifyNewMail"
-                    | ".lq.Lobby.oauth2Login"
-                    | ".lq.Lobby.fetchLastPrivacy"
-                    | ".lq.Lobby.fetchServerTime"
-                    | ".lq.Lobby.fetchServerSettings"
-                    | ".lq.Lobby.fetchConnectionInfo"
-                    | ".lq.Lobby.fetchClientValue"
-                    | ".lq.Lobby.fetchFriendList"
-                    | ".lq.Lobby.fetchFriendApplyList"
-                    | ".lq.Lobby.fetchRecentFriend"
-                    | ".lq.Lobby.fetchMailInfo"
-                    | ".lq.Lobby.fetchReviveCoinInfo"
-                    | ".lq.Lobby.fetchTitleList"
-                    | ".lq.Lobby.fetchBagInfo"
-                    | ".lq.Lobby.fetchShopInfo"
-                    | ".lq.Lobby.fetchShopInterval"
-                    | ".lq.Lobby.fetchActivityList"
-                    | ".lq.Lobby.fetchActivityInterval"
-                    | ".lq.Lobby.fetchActivityBuff"
-                    | ".lq.Lobby.fetchVipReward"
-                    | ".lq.Lobby.fetchMonthTicketInfo"
-                    | ".lq.Lobby.fetchAchievement"
-                    | ".lq.Lobby.fetchSelfGamePointRank"
-                    | ".lq.Lobby.fetchCommentSetting"
-                    | ".lq.Lobby.fetchAccountSettings"
-                    | ".lq.Lobby.fetchModNicknameTime"
-                    | ".lq.Lobby.fetchMisc"
-                    | ".lq.Lobby.fetchAnnouncement"
-                    | ".lq.Lobby.fetchRollingNotice"
-                    | ".lq.Lobby.loginSuccess"
-                    | ".lq.Lobby.fetchCharacterInfo"
-                    | ".lq.Lobby.fetchAllCommonViews"
-                    | ".lq.Lobby.fetchCollectedGameRecordList"
-                    | ".lq.Lobby.modifyRoom"
-                    | ".lq.NotifyRoomPlayerUpdate"
-                    | ".lq.NotifyRoomPlayerReady"
-                    | ".lq.Lobby.readyPlay"
-                    | ".lq.Lobby.fetchInfo"  # TODO: Analyzing content
-                    | ".lq.Lobby.fetchActivityFlipInfo"
-                    | ".lq.Lobby.fetchCustomizedContestList"
-                    | ".lq.Lobby.fetchCustomizedContestExtendInfo"
-                    | ".lq.Lobby.fetchCustomizedContestOnlineInfo"
-                    | ".lq.Lobby.startCustomizedContest"
-                    | ".lq.Lobby.stopCustomizedContest"
-                ):
-                    logger.info(message)
-                    continue
-                case ".lq.Lobby.payMonthTicket":
-                    logger.info(message)
-                    has_month_ticket = True
-                    continue
-                case (
-                    ".lq.Lobby.fetchDailyTask"
-                    | ".lq.Lobby.leaveRoom"
-                    | ".lq.Lobby.leaveCustomizedContest"
-                    | ".lq.Lobby.leaveCustomizedContestChatRoom"
-                    | ".lq.Lobby.fetchAccountActivityData"
-                ):
-                    logger.info(message)
+            if name in HomePresentation._LOGIN_IGNORED_MESSAGES:
+                logger.info(message)
+                continue
+            if name == ".lq.Lobby.payMonthTicket":
+                logger.info(message)
+                has_month_ticket = True
+                continue
+            if name in HomePresentation._LOGIN_COMPLETION_MESSAGES:
+                logger.info(message)
 
-                    break_ = False
-                    while True:
-                        next_message = (
-                            self._message_queue_client.dequeue_message(5)
-                        )
-                        if next_message is None:
-                            # If there are no more messages,
-                            # the transition to the home screen
-                            # has been completed.
-                            break_ = True
-                            break
-                        _, next_name, _, _, _ = next_message
-                        if next_name == ".lq.Lobby.heatbeat":
-                            # Discard subsequent
-                            # `.lq.Lobby.heatbeat` messages.
-                            logger.info(next_message)
-                            continue
-                        # Backfill the prefetched message and
-                        # proceed to the next.
-                        self._message_queue_client.put_back(next_message)
-                        break
-                    if break_:
-                        break
-                    continue
-                case ".lq.Lobby.loginBeat":
-                    logger.info(message)
-                    num_login_beats += 1
-                    if num_login_beats == 2:  # noqa: PLR2004
-                        break
-                    continue
-                case _:
-                    raise InconsistentMessageError(
-                        str(message),
-                        self._browser.get_screenshot(),
+                break_ = False
+                while True:
+                    next_message = self._message_queue_client.dequeue_message(
+                        5,
                     )
+                    if next_message is None:
+                        # If there are no more messages,
+                        # the transition to the home screen
+                        # has been completed.
+                        break_ = True
+                        break
+                    _, next_name, _, _, _ = next_message
+                    if next_name == ".lq.Lobby.heatbeat":
+                        # Discard subsequent
+                        # `.lq.Lobby.heatbeat` messages.
+                        logger.info(next_message)
+                        continue
+                    # Backfill the prefetched message and
+                    # proceed to the next.
+                    self._message_queue_client.put_back(next_message)
+                    break
+                if break_:
+                    break
+                continue
+            if name == ".lq.Lobby.loginBeat":
+                logger.info(message)
+                num_login_beats += 1
+                if num_login_beats == 2:  # noqa: PLR2004
+                    break
+                continue
+            raise InconsistentMessageError(
+                str(message),
+                self._browser.get_screenshot(),
+            )
 
         while True:
             message = self._message_queue_client.dequeue_message(0.1)
@@ -366,41 +402,35 @@ class HomePresentation(PresentationBase):
                 break
             _, name, _, _, _ = message
 
-            match name:
-                case (
-                    ".lq.Lobby.heatbeat"
-                    | ".lq.Lobby.updateClientValue"
-                    | ".lq.NotifyAccountUpdate"
-                    | ".lq.NotifyAnnouncementUpdate"
-                    | ".lq.Lobby.readAnnouncement"
-                    | ".lq.Lobby.doActivitySignIn"
-                    | ".lq.Lobby.fetchDailyTask"  # TODO: Analyzing content
-                ):
-                    logger.info(message)
-                    continue
-                case ".lq.Lobby.payMonthTicket":
-                    logger.info(message)
-                    has_month_ticket = True
-                    continue
-                case _:
-                    raise InconsistentMessageError(
-                        str(message),
-                        self._browser.get_screenshot(),
-                    )
+            if name in HomePresentation._POST_LOGIN_IGNORED_MESSAGES:
+                logger.info(message)
+                continue
+            if name == ".lq.Lobby.payMonthTicket":
+                logger.info(message)
+                has_month_ticket = True
+                continue
+            raise InconsistentMessageError(
+                str(message),
+                self._browser.get_screenshot(),
+            )
 
         # Wait for markers to display on the home screen.
         time.sleep(0.5)
 
-        if not HomePresentation._match_markers(
-            self._browser.get_screenshot(),
-            self._browser.zoom_ratio,
-        ):
+        ss = self._browser.get_screenshot()
+        if not HomePresentation._match_markers(ss, self._zoom_ratio):
             if has_month_ticket:
                 HomePresentation._receive_daily_bonus(self._browser, deadline)
-            HomePresentation._close_notifications(self._browser, deadline)
+            HomePresentation._close_notifications(
+                self._browser,
+                deadline,
+                # The screen has changed if the daily bonus was
+                # received.
+                None if has_month_ticket else ss,
+            )
 
             while True:
-                if datetime.datetime.now(datetime.UTC) > deadline:
+                if time.monotonic() > monotonic_deadline:
                     msg = "Timeout."
                     raise PresentationTimeoutError(
                         msg,
@@ -408,7 +438,7 @@ class HomePresentation(PresentationBase):
                     )
                 if HomePresentation._match_markers(
                     self._browser.get_screenshot(),
-                    self._browser.zoom_ratio,
+                    self._zoom_ratio,
                 ):
                     break
 
@@ -458,20 +488,20 @@ class HomePresentation(PresentationBase):
         # Click "Tournament Match".
         template = Template.open_file(
             "template/home/marker2",
-            self._browser.zoom_ratio,
+            self._zoom_ratio,
         )
         template.click(self._browser)
 
         # Wait until "Tournament Lobby" is displayed and then click.
         template = Template.open_file(
             "template/home/tournament_lobby",
-            self._browser.zoom_ratio,
+            self._zoom_ratio,
         )
         template.wait_until_then_click(self._browser, deadline)
 
         template = Template.open_file(
             "template/home/tournament_lobby/marker",
-            self._browser.zoom_ratio,
+            self._zoom_ratio,
         )
         template.wait_until(self._browser, deadline)
 
@@ -497,23 +527,23 @@ class HomePresentation(PresentationBase):
         # Wait until "Enter Tournament ID" is displayed and then click.
         template = Template.open_file(
             "template/home/tournament_lobby/enter_tournament_id",
-            self._browser.zoom_ratio,
+            self._zoom_ratio,
         )
         template.wait_until_then_click(self._browser, deadline)
 
         # Wait until "Confirm" is displayed.
         template = Template.open_file(
             "template/home/tournament_lobby/confirm",
-            self._browser.zoom_ratio,
+            self._zoom_ratio,
         )
         template.wait_until(self._browser, deadline)
 
         # Click the text box to focus it.
         self._browser.click_region(
-            int(660 * self._browser.zoom_ratio),
-            int(340 * self._browser.zoom_ratio),
-            int(410 * self._browser.zoom_ratio),
-            int(40 * self._browser.zoom_ratio),
+            int(660 * self._zoom_ratio),
+            int(340 * self._zoom_ratio),
+            int(410 * self._zoom_ratio),
+            int(40 * self._zoom_ratio),
         )
         time.sleep(0.1)
 
@@ -526,7 +556,7 @@ class HomePresentation(PresentationBase):
         try:
             template = Template.open_file(
                 "template/home/tournament_lobby/error_close",
-                self._browser.zoom_ratio,
+                self._zoom_ratio,
             )
             template.wait_for_then_click(self._browser, 1.5)
         except PresentationTimeoutError:
@@ -555,7 +585,7 @@ class HomePresentation(PresentationBase):
             # Click on the icon to leave the tournament lobby.
             template = Template.open_file(
                 "template/home/tournament_lobby/leave",
-                self._browser.zoom_ratio,
+                self._zoom_ratio,
             )
             template.wait_until_then_click(self._browser, deadline)
             time.sleep(1.5)
@@ -617,28 +647,29 @@ class HomePresentation(PresentationBase):
         # Click "Friendly Match".
         template = Template.open_file(
             "template/home/marker3",
-            self._browser.zoom_ratio,
+            self._zoom_ratio,
         )
         template.click(self._browser)
 
         # Wait until "Create room" is displayed and then click.
         template = Template.open_file(
             "template/home/create_room",
-            self._browser.zoom_ratio,
+            self._zoom_ratio,
         )
         template.wait_until_then_click(self._browser, deadline)
 
         # Wait until "Create" is displayed.
         template = Template.open_file(
             "template/home/room_creation/create",
-            self._browser.zoom_ratio,
+            self._zoom_ratio,
         )
         template.wait_until(self._browser, deadline)
 
         def select_option(selected: str) -> None:
-            template = Template.open_file(selected, self._browser.zoom_ratio)
+            template = Template.open_file(selected, self._zoom_ratio)
+            monotonic_deadline = deadline_to_monotonic(deadline)
             while True:
-                if datetime.datetime.now(datetime.UTC) > deadline:
+                if time.monotonic() > monotonic_deadline:
                     msg = "Timeout."
                     raise PresentationTimeoutError(
                         msg,
@@ -729,30 +760,30 @@ class HomePresentation(PresentationBase):
         # Click "Friendly Match".
         template = Template.open_file(
             "template/home/marker3",
-            self._browser.zoom_ratio,
+            self._zoom_ratio,
         )
         template.click(self._browser)
 
         # Wait until "Join room" is displayed and then click.
         template = Template.open_file(
             "template/home/join_room",
-            self._browser.zoom_ratio,
+            self._zoom_ratio,
         )
         template.wait_until_then_click(self._browser, deadline)
 
         # Wait until "Confirm" is displayed.
         template = Template.open_file(
             "template/home/room_join/confirm",
-            self._browser.zoom_ratio,
+            self._zoom_ratio,
         )
         template.wait_until(self._browser, deadline)
 
         # Click the text box to focus it.
         self._browser.click_region(
-            int(660 * self._browser.zoom_ratio),
-            int(340 * self._browser.zoom_ratio),
-            int(410 * self._browser.zoom_ratio),
-            int(40 * self._browser.zoom_ratio),
+            int(660 * self._zoom_ratio),
+            int(340 * self._zoom_ratio),
+            int(410 * self._zoom_ratio),
+            int(40 * self._zoom_ratio),
         )
         time.sleep(0.1)
 
@@ -765,7 +796,7 @@ class HomePresentation(PresentationBase):
         try:
             template = Template.open_file(
                 "template/home/room_join/error_close",
-                self._browser.zoom_ratio,
+                self._zoom_ratio,
             )
             template.wait_for(self._browser, 1.5)
         except PresentationTimeoutError:
@@ -779,16 +810,17 @@ class HomePresentation(PresentationBase):
 
             # Click "Back".
             self._browser.click_region(
-                int(1175 * self._browser.zoom_ratio),
-                int(250 * self._browser.zoom_ratio),
-                int(100 * self._browser.zoom_ratio),
-                int(34 * self._browser.zoom_ratio),
+                int(1175 * self._zoom_ratio),
+                int(250 * self._zoom_ratio),
+                int(100 * self._zoom_ratio),
+                int(34 * self._zoom_ratio),
             )
             time.sleep(1.0)
 
             reason = None
+            monotonic_deadline = deadline_to_monotonic(deadline)
             while True:
-                if datetime.datetime.now(datetime.UTC) > deadline:
+                if time.monotonic() > monotonic_deadline:
                     msg = "Timeout."
                     raise PresentationTimeoutError(msg, ss)
 
@@ -2,9 +2,9 @@ import base64
 from collections.abc import Mapping
 from typing import Any
 
-import google.protobuf.json_format
 from google.protobuf.message_factory import GetMessageClass
 
+from majsoulrpa._impl.message_dict import message_to_dict
 from majsoulrpa._impl.protobuf_liqi import liqi_pb2
 
 _MESSAGE_TYPE_MAP = {}
@@ -38,11 +38,7 @@ def parse_action(
 
     parser = _MESSAGE_TYPE_MAP[f".lq.{name}"]()
     parser.ParseFromString(data)
-    result = google.protobuf.json_format.MessageToDict(
-        parser,
-        including_default_value_fields=True,
-        preserving_proto_field_name=True,
-    )
+    result = message_to_dict(parser)
 
     return step, name, result
 
@@ -2,9 +2,9 @@ import datetime
 
 
 class EventBase:
-    def __init__(self, timestamp: datetime.datetime) -> None:
+    def __init__(self, timestamp: float) -> None:
         self._timestamp = timestamp
 
     @property
     def timestamp(self) -> datetime.datetime:
-        return self._timestamp
+        return datetime.datetime.fromtimestamp(self._timestamp, datetime.UTC)
@@ -1,5 +1,4 @@
 # ruff: noqa: PLR2004, S101
-import datetime
 from collections.abc import Mapping
 from typing import Any
 
@@ -10,7 +9,7 @@ class DapaiEvent(EventBase):
     def __init__(
         self,
         data: Mapping[str, Any],
-        timestamp: datetime.datetime,
+        timestamp: float,
     ) -> None:
         super().__init__(timestamp)
         self._seat = data["seat"]
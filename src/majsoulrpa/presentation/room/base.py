@@ -180,7 +180,8 @@ class RoomPresentationBase(PresentationBase):
             f"name: {name}\n"
             f"request: {request}\n"
             f"response: {response}\n"
-            f"timestamp: {timestamp}"
+            "timestamp: "
+            f"{datetime.datetime.fromtimestamp(timestamp, datetime.UTC)}"
         )
         raise InconsistentMessageError(msg)
 
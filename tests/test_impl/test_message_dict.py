@@ -0,0 +1,98 @@
+import math
+import random
+
+import pytest
+from google.protobuf.descriptor import FieldDescriptor
+from google.protobuf.json_format import MessageToDict
+from google.protobuf.message import Message
+from google.protobuf.message_factory import GetMessageClass
+
+from majsoulrpa._impl.message_dict import message_to_dict
+from majsoulrpa._impl.protobuf_liqi import liqi_pb2
+
+_MESSAGE_CLASSES = [
+    GetMessageClass(desc)
+    for desc in liqi_pb2.DESCRIPTOR.message_types_by_name.values()
+]
+
+_FLOATS = [0.0, -0.0, 0.9, 1.5, -3.25, 1e30, math.inf, -math.inf, math.nan]
+
+
+def _random_scalar(field: FieldDescriptor, rng: random.Random) -> object:
+    match field.cpp_type:
+        case FieldDescriptor.CPPTYPE_INT32:
+            return rng.randint(-(2**31), 2**31 - 1)
+        case FieldDescriptor.CPPTYPE_UINT32:
+            return rng.randint(0, 2**32 - 1)
+        case FieldDescriptor.CPPTYPE_INT64:
+            return rng.randint(-(2**63), 2**63 - 1)
+        case FieldDescriptor.CPPTYPE_UINT64:
+            return rng.randint(0, 2**64 - 1)
+        case FieldDescriptor.CPPTYPE_FLOAT | FieldDescriptor.CPPTYPE_DOUBLE:
+            return rng.choice([*_FLOATS, rng.uniform(-1e6, 1e6)])
+        case FieldDescriptor.CPPTYPE_BOOL:
+            return rng.random() < 0.5  # noqa: PLR2004
+        case FieldDescriptor.CPPTYPE_ENUM:
+            # Include a number that is not defined in the enum.
+            numbers = list(field.enum_type.values_by_number)
+            return rng.choice([*numbers, max(numbers) + 1])
+        case _:
+            if field.type == FieldDescriptor.TYPE_BYTES:
+                return rng.randbytes(rng.randint(0, 8))
+            return "".join(rng.choices("abc雀魂", k=rng.randint(0, 8)))
+
+
+def _fill(message: Message, rng: random.Random, depth: int) -> None:  # noqa: C901
+    for field in message.DESCRIPTOR.fields:
+        if rng.random() < 0.3:  # noqa: PLR2004
+            continue
+        is_message = field.cpp_type == FieldDescriptor.CPPTYPE_MESSAGE
+        if is_message and field.message_type.GetOptions().map_entry:
+            key_field = field.message_type.fields_by_name["key"]
+            value_field = field.message_type.fields_by_name["value"]
+            container = getattr(message, field.name)
+            for _ in range(rng.randint(0, 3)):
+                key = _random_scalar(key_field, rng)
+                if value_field.cpp_type == FieldDescriptor.CPPTYPE_MESSAGE:
+                    if depth > 0:
+                        _fill(container[key], rng, depth - 1)
+                else:
+                    container[key] = _random_scalar(value_field, rng)
+        elif field.label == FieldDescriptor.LABEL_REPEATED:
+            container = getattr(message, field.name)
+            for _ in range(rng.randint(0, 3)):
+                if is_message:
+                    if depth > 0:
+                        _fill(container.add(), rng, depth - 1)
+                else:
+                    container.append(_random_scalar(field, rng))
+        elif is_message:
+            if depth > 0:
+                _fill(getattr(message, field.name), rng, depth - 1)
+        else:
+            setattr(message, field.name, _random_scalar(field, rng))
+
+
+def _expected(message: Message) -> dict[str, object]:
+    return MessageToDict(
+        message,
+        including_default_value_fields=True,
+        preserving_proto_field_name=True,
+    )
+
+
+@pytest.mark.parametrize(
+    "message_class",
+    _MESSAGE_CLASSES,
+    ids=lambda message_class: message_class.DESCRIPTOR.name,
+)
+def test_message_to_dict(message_class: type[Message]) -> None:
+    message = message_class()
+    assert repr(message_to_dict(message)) == repr(_expected(message))
+
+    rng = random.Random(message_class.DESCRIPTOR.full_name)  # noqa: S311
+    for _ in range(3):
+        message = message_class()
+        _fill(message, rng, depth=2)
+        # Compared as strings so that NaN values are equal.
+        assert repr(message_to_dict(message)) == repr(_expected(message))
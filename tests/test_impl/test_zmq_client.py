@@ -0,0 +1,190 @@
+import gc
+import struct
+import time
+import weakref
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+import zmq
+
+from majsoulrpa._impl.protobuf_liqi import liqi_pb2
+from majsoulrpa._impl.zmq_client import ZMQClient
+
+_TIMEOUT = 1.0
+
+
+def _wrap(name: str, data: bytes) -> bytes:
+    wrapper = liqi_pb2.Wrapper()  # type: ignore[attr-defined]
+    wrapper.name = name
+    wrapper.data = data
+    return wrapper.SerializeToString()
+
+
+def _notify_frames(name: str, timestamp: float) -> list[bytes]:
+    return [
+        b"ws",
+        b"inbound",
+        b"\x01" + _wrap(name, b""),
+        b"",
+        struct.pack("!d", timestamp),
+    ]
+
+
+def _rpc_frames(name: str, response: bytes) -> list[bytes]:
+    return [
+        b"ws",
+        b"outbound",
+        b"\x02\x01\x00" + _wrap(name, b""),
+        response,
+        struct.pack("!d", 1.0),
+    ]
+
+
+@pytest.fixture()
+def publisher() -> Iterator[tuple[zmq.Socket, int]]:
+    context = zmq.Context()
+    # XPUB reports subscriptions, so messages are not sent before the
+    # client has subscribed.
+    socket = context.socket(zmq.XPUB)
+    port = socket.bind_to_random_port(
+        "tcp://127.0.0.1",
+        min_port=1024,
+        max_port=49151,
+    )
+    yield socket, port
+    socket.close(linger=0)
+    context.destroy()
+
+
+def _connect(
+    publisher: tuple[zmq.Socket, int],
+) -> tuple[zmq.Socket, ZMQClient]:
+    socket, port = publisher
+    client = ZMQClient(port=port)
+    assert socket.recv() == b"\x01ws"
+    return socket, client
+
+
+def _send_all(socket: zmq.Socket, messages: list[list[bytes]]) -> None:
+    for frames in messages:
+        socket.send_multipart(frames)
+    # Let all messages arrive, so that they are received in one batch.
+    time.sleep(0.1)
+
+
+def test_error_in_batch_keeps_other_messages(
+    publisher: tuple[zmq.Socket, int],
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    # Raw data of an unknown API is saved in the current directory.
+    monkeypatch.chdir(tmp_path)
+    socket, client = _connect(publisher)
+    _send_all(
+        socket,
+        [
+            _notify_frames(".lq.NotifyAccountUpdate", 1.0),
+            _notify_frames(".lq.UnknownNotify", 2.0),
+            _notify_frames(".lq.NotifyAccountUpdate", 3.0),
+            _notify_frames(".lq.NotifyAccountUpdate", 4.0),
+            _notify_frames(".lq.NotifyAccountUpdate", 5.0),
+        ],
+    )
+
+    message = client.dequeue_message(_TIMEOUT)
+    assert message is not None
+    assert message[4] == 1.0
+
+    with pytest.raises(RuntimeError, match="A new API found"):
+        client.dequeue_message(_TIMEOUT)
+
+    timestamps = []
+    for _ in range(3):
+        message = client.dequeue_message(_TIMEOUT)
+        assert message is not None
+        timestamps.append(message[4])
+    assert timestamps == [3.0, 4.0, 5.0]
+    assert client.dequeue_message(0.1) is None
+
+
+@pytest.mark.parametrize(
+    ("response", "error"),
+    [
+        (b"\x07\x01\x00" + _wrap("", b""), "7: unknown response type"),
+        (
+            b"\x03\x01\x00" + _wrap(".lq.Lobby.heatbeat", b""),
+            ".lq.Lobby.heatbeat: unknown response name",
+        ),
+    ],
+)
+def test_malformed_response_raises_when_dequeued(
+    publisher: tuple[zmq.Socket, int],
+    response: bytes,
+    error: str,
+) -> None:
+    socket, client = _connect(publisher)
+    _send_all(socket, [_rpc_frames(".lq.Lobby.heatbeat", response)])
+
+    with pytest.raises(RuntimeError, match=error):
+        client.dequeue_message(_TIMEOUT)
+
+
+def test_response_is_parsed_on_access(
+    publisher: tuple[zmq.Socket, int],
+) -> None:
+    socket, client = _connect(publisher)
+    response = liqi_pb2.ResCommon()  # type: ignore[attr-defined]
+    response.error.code = 42
+    _send_all(
+        socket,
+        [
+            _rpc_frames(
+                ".lq.Lobby.heatbeat",
+                b"\x03\x01\x00" + _wrap("", response.SerializeToString()),
+            ),
+        ],
+    )
+
+    message = client.dequeue_message(_TIMEOUT)
+    assert message is not None
+    assert message[1] == ".lq.Lobby.heatbeat"
+    assert message[3] is not None
+    assert message[3]["error"]["code"] == 42  # noqa: PLR2004
+
+
+def test_accessed_message_does_not_keep_client_alive(
+    publisher: tuple[zmq.Socket, int],
+) -> None:
+    socket, client = _connect(publisher)
+    _send_all(socket, [_notify_frames(".lq.NotifyAccountUpdate", 1.0)])
+
+    message = client.dequeue_message(_TIMEOUT)
+    assert message is not None
+    dict(message[2])
+
+    client_ref = weakref.ref(client)
+    del client
+    gc.collect()
+    assert client_ref() is None
+
+
+def test_put_back_message_is_dequeued_first(
+    publisher: tuple[zmq.Socket, int],
+) -> None:
+    socket, client = _connect(publisher)
+    _send_all(
+        socket,
+        [
+            _notify_frames(".lq.NotifyAccountUpdate", 1.0),
+            _notify_frames(".lq.NotifyAccountUpdate", 2.0),
+        ],
+    )
+
+    message = client.dequeue_message(_TIMEOUT)
+    assert message is not None
+    client.put_back(message)
+    assert client.dequeue_message(_TIMEOUT) is message
+    message = client.dequeue_message(_TIMEOUT)
+    assert message is not None
+    assert message[4] == 2.0  # noqa: PLR2004